@@ -18,17 +18,24 @@ import time
 import logging
 import pickle
 import argparse
+import importlib.util
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 # ── Third-party imports ──────────────────────────────────────────────────────
+# The OAuth flow and HTTP transport stack (requests, httplib2, discovery) are
+# only needed to talk to Gmail, so authenticate() and build_service() import
+# them on first use. This keeps importing the label tables and helpers cheap;
+# find_spec still checks they are installed without importing them.
 try:
-    from google.auth.transport.requests import Request
     from google.oauth2.credentials import Credentials
-    from google_auth_oauthlib.flow import InstalledAppFlow
-    from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
+    for _module in ("google_auth_oauthlib", "google_auth_httplib2", "httplib2", "requests"):
+        if importlib.util.find_spec(_module) is None:
+            raise ImportError(f"No module named '{_module}'")
+    del _module
 except ImportError:
     print("\033[91m[ERROR]\033[0m Missing dependencies. Install with:")
     print("  pip install google-api-python-client google-auth-httplib2 google-auth-oauthlib")
@@ -43,6 +50,9 @@ LOG_FILE = "gmail_organizer.log"
 BATCH_SIZE = 100  # messages per page
 MAX_RETRIES = 7
 BASE_DELAY = 1.0  # seconds
+REQUEST_TIMEOUT = 30  # seconds per HTTP request
+BATCH_REQUEST_LIMIT = 50  # calls per Gmail batch request
+RETRYABLE_STATUSES = (429, 500, 503)  # rate limit / transient server errors
 
 # ── ANSI Colors ──────────────────────────────────────────────────────────────
 class C:
@@ -63,6 +73,20 @@ class C:
     BG_RED    = "\033[41m"
     BG_MAGENTA = "\033[45m"
 
+# ── Output Templates ─────────────────────────────────────────────────────────
+PROGRESS_EVERY = 50  # messages between progress lines...
+PROGRESS_INTERVAL = 1.0  # ...and at least this many seconds apart
+PROGRESS_FMT = f"    {C.GRAY}...moved {{}} emails{C.RESET}"
+PROCESSING_FMT = f"  {C.MAGENTA}▸{C.RESET} Processing message {C.BOLD}{{}}{C.RESET}..."
+# Table rows: old label, new label, count color, count
+PLAN_ROW = (f"  {C.YELLOW}{{:<30.30}}{C.RESET} {C.CYAN}→{C.RESET} "
+            f"{C.GREEN}{{:<35.35}}{C.RESET} {{}}{{:>6}}{C.RESET}")
+REPORT_ROW = (f"  {C.YELLOW}{{:<30.30}}{C.RESET} {C.CYAN}→{C.RESET} "
+              f"{C.GREEN}{{:<30.30}}{C.RESET} {{}}{{:>6}}{C.RESET}")
+# Summary rows: label, count, bar
+SUMMARY_ROW = f"    {C.BLUE}{{:<55}}{C.RESET} {C.GREEN}{{:>5}}{C.RESET} {C.MAGENTA}{{}}{C.RESET}"
+SUMMARY_BAR = "█" * 40
+
 # ── Complete Label Hierarchy ─────────────────────────────────────────────────
 LABEL_HIERARCHY = [
     # TIMELINE-EVIDENCE
@@ -184,6 +208,9 @@ LABEL_HIERARCHY = [
     # FLAGGED-REVIEW
     "FLAGGED-REVIEW",
 ]
+LABEL_HIERARCHY_SET = frozenset(LABEL_HIERARCHY)
+# A label starting with any of these prefixes is nested inside the hierarchy
+HIERARCHY_CHILD_PREFIXES = tuple(label + "/" for label in LABEL_HIERARCHY)
 
 # ── Migration Mapping: Old Label Patterns → New Hierarchy ────────────────────
 # Each entry: (pattern_to_match_old_label, new_hierarchy_label)
@@ -316,6 +343,13 @@ MIGRATION_MAP = [
     (r"^flag",                            "FLAGGED-REVIEW"),
 ]
 
+# Every MIGRATION_MAP pattern is anchored with "^", so a single alternation
+# matched at position 0 returns the first pattern, in map order, that fits.
+MIGRATION_MATCHER = re.compile(
+    "|".join(f"(?P<m{i}>{pattern})" for i, (pattern, _) in enumerate(MIGRATION_MAP)),
+    re.IGNORECASE,
+)
+
 # ── Categorization Rules ─────────────────────────────────────────────────────
 CATEGORIZATION_RULES = [
     # Self-emails (from AND to same address)
@@ -515,6 +549,33 @@ CATEGORIZATION_RULES = [
     },
 ]
 
+def _compile_address_pattern(pattern: str):
+    """
+    Compile a From/To pattern. Plain literals (almost every rule, e.g.
+    'github\\.com') become a lowercase string for a substring test against
+    the already-lowercased address; anything else stays a regex.
+    """
+    literal = pattern.replace("\\", "")
+    if re.escape(literal) == pattern:
+        return literal.lower()
+    return re.compile(pattern, re.IGNORECASE)
+
+
+# Rule patterns compiled once, parallel to CATEGORIZATION_RULES:
+# (from_pat, to_pat, subject_re, requires List-Unsubscribe)
+# from_pat/to_pat are a lowercase literal str or a compiled regex.
+COMPILED_RULES = [
+    (
+        _compile_address_pattern(rule["from_pattern"]) if "from_pattern" in rule else None,
+        _compile_address_pattern(rule["to_pattern"]) if "to_pattern" in rule else None,
+        re.compile(rule["subject_pattern"]) if "subject_pattern" in rule else None,
+        bool(rule.get("has_unsubscribe")),
+    )
+    for rule in CATEGORIZATION_RULES
+]
+# Label names of each rule, parallel to CATEGORIZATION_RULES
+RULE_LABEL_NAMES = [tuple(rule["labels"]) for rule in CATEGORIZATION_RULES]
+
 
 # ── Logging Setup ────────────────────────────────────────────────────────────
 def setup_logging(log_file: str = LOG_FILE) -> logging.Logger:
@@ -561,6 +622,9 @@ class ColorFormatter(logging.Formatter):
 def authenticate(credentials_file: str = CREDENTIALS_FILE,
                  token_file: str = TOKEN_FILE) -> Credentials:
     """Authenticate via OAuth2, opening browser on first run."""
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     creds = None
     if os.path.exists(token_file):
         with open(token_file, "rb") as f:
@@ -581,6 +645,21 @@ def authenticate(credentials_file: str = CREDENTIALS_FILE,
     return creds
 
 
+def build_service(creds: Credentials):
+    """
+    Build the Gmail API client with an explicit REQUEST_TIMEOUT. The
+    transport is the one build(credentials=...) would create, except for
+    the timeout.
+    """
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.discovery import build
+    from googleapiclient.http import build_http
+
+    http = build_http()
+    http.timeout = REQUEST_TIMEOUT
+    return build("gmail", "v1", http=AuthorizedHttp(creds, http=http))
+
+
 def api_call_with_backoff(func, *args, max_retries=MAX_RETRIES, **kwargs):
     """Execute an API call with exponential backoff on rate-limit errors."""
     logger = logging.getLogger("gmail_organizer")
@@ -588,7 +667,7 @@ def api_call_with_backoff(func, *args, max_retries=MAX_RETRIES, **kwargs):
         try:
             return func(*args, **kwargs)
         except HttpError as e:
-            if e.resp.status in (429, 500, 503):
+            if e.resp.status in RETRYABLE_STATUSES:
                 delay = BASE_DELAY * (2 ** attempt)
                 logger.warning(
                     f"Rate limited (HTTP {e.resp.status}). "
@@ -671,46 +750,95 @@ def extract_header(headers: list, name: str) -> str:
     return ""
 
 
-def categorize_message(headers: list) -> list:
+def header_values(headers: list) -> dict:
     """
-    Determine which labels to apply based on message headers.
-    Returns a list of label names. Multiple labels can be applied.
+    Map lowercased header names to their values in one pass over the
+    message headers. The first occurrence wins, as in extract_header.
     """
-    from_addr = extract_header(headers, "From").lower()
-    to_addr = extract_header(headers, "To").lower()
-    subject = extract_header(headers, "Subject")
-    list_unsub = extract_header(headers, "List-Unsubscribe")
+    values = {}
+    for h in headers:
+        values.setdefault(h["name"].lower(), h.get("value", ""))
+    return values
 
-    matched_labels = []
 
-    for rule in CATEGORIZATION_RULES:
-        match = True
+def match_rules(values: dict) -> list:
+    """
+    Return the indexes of every CATEGORIZATION_RULES entry that matches
+    the header values (from header_values), in rule order.
+    """
+    from_addr = values.get("from", "").lower()
+    to_addr = values.get("to", "").lower()
+    subject = values.get("subject", "")
+    list_unsub = values.get("list-unsubscribe", "")
+
+    matched_rules = []
+
+    for idx, (from_pat, to_pat, subject_re, needs_unsub) in enumerate(COMPILED_RULES):
+        if from_pat is not None and not (
+            from_pat in from_addr if type(from_pat) is str else from_pat.search(from_addr)
+        ):
+            continue
+        if to_pat is not None and not (
+            to_pat in to_addr if type(to_pat) is str else to_pat.search(to_addr)
+        ):
+            continue
+        if subject_re and not subject_re.search(subject):
+            continue
+        if needs_unsub and not list_unsub:
+            continue
+        matched_rules.append(idx)
+
+    return matched_rules
+
+
+def merge_rule_labels(rule_idxs: list, rule_labels: list, fallback: tuple) -> list:
+    """
+    Merge the labels of the matched rules (rule_labels is parallel to
+    CATEGORIZATION_RULES), keeping first-seen order and dropping duplicates.
+    Returns list(fallback) when no rule matched.
+    """
+    if not rule_idxs:
+        return list(fallback)
 
-        if "from_pattern" in rule:
-            if not re.search(rule["from_pattern"], from_addr, re.IGNORECASE):
-                match = False
+    merged = []
+    for idx in rule_idxs:
+        for lbl in rule_labels[idx]:
+            if lbl not in merged:
+                merged.append(lbl)
+    return merged
 
-        if "to_pattern" in rule:
-            if not re.search(rule["to_pattern"], to_addr, re.IGNORECASE):
-                match = False
 
-        if "subject_pattern" in rule:
-            if not re.search(rule["subject_pattern"], subject):
-                match = False
+def categorize_message(headers: list) -> list:
+    """
+    Determine which labels to apply based on message headers.
+    Returns a list of label names. Multiple labels can be applied.
+    """
+    return merge_rule_labels(match_rules(header_values(headers)), RULE_LABEL_NAMES,
+                             ("FLAGGED-REVIEW",))
 
-        if "has_unsubscribe" in rule and rule["has_unsubscribe"]:
-            if not list_unsub:
-                match = False
 
-        if match:
-            for lbl in rule["labels"]:
-                if lbl not in matched_labels:
-                    matched_labels.append(lbl)
+def resolve_rule_label_ids(label_map: dict, logger: logging.Logger) -> list:
+    """
+    Resolve each rule's label names against label_map once, up front.
+    Returns a list parallel to CATEGORIZATION_RULES whose entries are
+    tuples of (label name, label id); labels missing from label_map are
+    left out with a single warning each.
+    """
+    missing = set()
+    resolved = []
 
-    if not matched_labels:
-        matched_labels.append("FLAGGED-REVIEW")
+    for labels in RULE_LABEL_NAMES:
+        targets = []
+        for lbl in labels:
+            lid = label_map.get(lbl)
+            if lid:
+                targets.append((lbl, lid))
+            elif lbl not in missing:
+                missing.add(lbl)
+                logger.warning(f"Label '{lbl}' not found in label_map")
+        resolved.append(tuple(targets))
 
-    return matched_labels
+    return resolved
 
 
 def apply_labels(service, message_id: str, label_ids: list, logger: logging.Logger,
@@ -734,6 +862,13 @@ def apply_labels(service, message_id: str, label_ids: list, logger: logging.Logg
 # ██  MIGRATION ENGINE  ██
 # ══════════════════════════════════════════════════════════════════════════════
 
+def in_hierarchy(label_name: str) -> bool:
+    """Return True if the label is, or is nested under, a hierarchy label."""
+    return (label_name in LABEL_HIERARCHY_SET
+            or label_name.startswith(HIERARCHY_CHILD_PREFIXES))
+
+
+@lru_cache(maxsize=4096)
 def map_old_label_to_new(old_label_name: str) -> Optional[str]:
     """
     Given an old label name, return the best matching new hierarchy label.
@@ -745,28 +880,23 @@ def map_old_label_to_new(old_label_name: str) -> Optional[str]:
     if old_label_name.upper().startswith(system_prefixes):
         return None
 
-    # Skip labels that are already part of our hierarchy
-    hierarchy_set = set(LABEL_HIERARCHY)
-    if old_label_name in hierarchy_set:
+    # Skip labels that are already part of (or nested in) our hierarchy
+    if in_hierarchy(old_label_name):
         return None
 
-    # Check if it's a child of an existing hierarchy label
-    for h_label in LABEL_HIERARCHY:
-        if old_label_name.startswith(h_label + "/"):
-            return None
-
-    # Try pattern matching
-    # Get the leaf name for matching (last segment if nested)
+    # Try pattern matching against the leaf name (last segment if nested)
+    # and the full path; the earliest MIGRATION_MAP entry matching either wins
     leaf_name = old_label_name.rsplit("/", 1)[-1] if "/" in old_label_name else old_label_name
 
-    for pattern, new_label in MIGRATION_MAP:
-        if re.search(pattern, leaf_name, re.IGNORECASE):
-            return new_label
-        # Also try the full path
-        if re.search(pattern, old_label_name, re.IGNORECASE):
-            return new_label
+    best = None
+    for candidate in {leaf_name, old_label_name}:
+        m = MIGRATION_MATCHER.match(candidate)
+        if m:
+            idx = int(m.lastgroup[1:])
+            if best is None or idx < best:
+                best = idx
 
-    return None
+    return MIGRATION_MAP[best][1] if best is not None else None
 
 
 def discover_migration_targets(service, logger: logging.Logger) -> list:
@@ -775,29 +905,14 @@ def discover_migration_targets(service, logger: logging.Logger) -> list:
     Returns list of dicts: {old_name, old_id, new_name, message_count}
     """
     all_labels = get_existing_labels_full(service)
-    hierarchy_set = set(LABEL_HIERARCHY)
     migration_plan = []
 
     for lbl in all_labels:
         lbl_name = lbl["name"]
         lbl_id = lbl["id"]
-        lbl_type = lbl.get("type", "user")
-
-        # Skip system labels
-        if lbl_type == "system":
-            continue
 
-        # Skip labels already in our hierarchy
-        if lbl_name in hierarchy_set:
-            continue
-
-        # Skip labels that are children of our hierarchy
-        is_child = False
-        for h_label in LABEL_HIERARCHY:
-            if lbl_name.startswith(h_label + "/"):
-                is_child = True
-                break
-        if is_child:
+        # Skip system labels and labels already in (or under) our hierarchy
+        if lbl.get("type", "user") == "system" or in_hierarchy(lbl_name):
             continue
 
         new_label = map_old_label_to_new(lbl_name)
@@ -836,12 +951,10 @@ def print_migration_plan(plan: list):
 
     total_emails = 0
     for entry in plan:
-        old = entry["old_name"][:30]
-        new = entry["new_name"][:35]
         count = entry["message_count"]
         total_emails += count
         color = C.GREEN if count > 0 else C.GRAY
-        print(f"  {C.YELLOW}{old:<30}{C.RESET} {C.CYAN}→{C.RESET} {C.GREEN}{new:<35}{C.RESET} {color}{count:>6}{C.RESET}")
+        print(PLAN_ROW.format(entry["old_name"], entry["new_name"], color, count))
 
     print(f"\n  {C.BOLD}Total labels to migrate: {len(plan)}{C.RESET}")
     print(f"  {C.BOLD}Total emails to move:    {total_emails}{C.RESET}\n")
@@ -866,6 +979,8 @@ def execute_migration(service, plan: list, label_map: dict,
         print(f"  {C.YELLOW}{C.BOLD}⚠ DRY RUN — no changes will be made{C.RESET}")
     print(f"{C.CYAN}{'─' * 60}{C.RESET}")
 
+    last_print = 0.0
+
     for i, entry in enumerate(plan):
         old_name = entry["old_name"]
         old_id = entry["old_id"]
@@ -919,8 +1034,11 @@ def execute_migration(service, plan: list, label_map: dict,
                     )
                 moved_count += 1
 
-                if moved_count % 50 == 0:
-                    print(f"    {C.GRAY}...moved {moved_count} emails{C.RESET}")
+                if moved_count % PROGRESS_EVERY == 0:
+                    now = time.monotonic()
+                    if now - last_print > PROGRESS_INTERVAL:
+                        print(PROGRESS_FMT.format(moved_count))
+                        last_print = now
 
             page_token = results.get("nextPageToken")
             if not page_token:
@@ -950,12 +1068,9 @@ def print_migration_report(stats: dict):
         print(f"  {'─'*30} {'─':^3} {'─'*30} {'─'*6}")
 
         for d in stats["details"]:
-            old = d["old"][:30]
-            new = d["new"][:30]
             count = d["count"]
             color = C.GREEN if count > 0 else C.GRAY
-            print(f"  {C.YELLOW}{old:<30}{C.RESET} {C.CYAN}→{C.RESET} "
-                  f"{C.GREEN}{new:<30}{C.RESET} {color}{count:>6}{C.RESET}")
+            print(REPORT_ROW.format(d["old"], d["new"], color, count))
 
     print(f"\n  {C.GREEN}{C.BOLD}Labels migrated : {stats['labels_migrated']}{C.RESET}")
     print(f"  {C.GREEN}{C.BOLD}Emails moved    : {stats['emails_moved']}{C.RESET}")
@@ -963,6 +1078,74 @@ def print_migration_report(stats: dict):
     print(f"{C.CYAN}{'─' * 80}{C.RESET}\n")
 
 
+def _execute_batched(service, requests: list, callback, max_retries=MAX_RETRIES):
+    """
+    Run (request_id, HttpRequest) pairs as Gmail batch requests of at
+    most BATCH_REQUEST_LIMIT calls each. callback receives
+    (request_id, response, exception) for every call.
+
+    Calls that fail with a retryable status are re-sent in a follow-up
+    batch with exponential backoff; the final failure reaches the callback.
+    A batch that fails as a whole reports its error for each of its calls.
+    """
+    logger = logging.getLogger("gmail_organizer")
+    by_id = dict(requests)
+    pending = list(by_id)
+
+    for attempt in range(max_retries):
+        retry = []
+
+        def _collect(request_id, response, exception):
+            if (attempt < max_retries - 1 and isinstance(exception, HttpError)
+                    and exception.resp.status in RETRYABLE_STATUSES):
+                retry.append(request_id)
+            else:
+                callback(request_id, response, exception)
+
+        for start in range(0, len(pending), BATCH_REQUEST_LIMIT):
+            chunk = pending[start:start + BATCH_REQUEST_LIMIT]
+            batch = service.new_batch_http_request(callback=_collect)
+            for request_id in chunk:
+                batch.add(by_id[request_id], request_id=request_id)
+            try:
+                api_call_with_backoff(batch.execute)
+            except HttpError as e:
+                for request_id in chunk:
+                    callback(request_id, None, e)
+
+        if not retry:
+            return
+        delay = BASE_DELAY * (2 ** attempt)
+        logger.warning(
+            f"{len(retry)} batched calls rate limited. "
+            f"Retry {attempt+1}/{max_retries} in {delay:.1f}s..."
+        )
+        time.sleep(delay)
+        pending = retry
+
+
+def get_label_totals(service, plan: list, logger: logging.Logger) -> dict:
+    """
+    Fetch the current message count of every old label in the plan with
+    batched labels.get calls. Returns old_id → messagesTotal; labels that
+    no longer exist are left out.
+    """
+    names = {entry["old_id"]: entry["old_name"] for entry in plan}
+    totals = {}
+
+    def _capture_total(request_id, response, exception):
+        if exception is None:
+            totals[request_id] = response.get("messagesTotal", 0)
+        elif not (isinstance(exception, HttpError) and exception.resp.status == 404):
+            logger.warning(f"Could not check label '{names[request_id]}': {exception}")
+
+    _execute_batched(service, [
+        (old_id, service.users().labels().get(userId="me", id=old_id))
+        for old_id in names
+    ], _capture_total)
+    return totals
+
+
 def cleanup_empty_labels(service, plan: list, logger: logging.Logger,
                          dry_run: bool = False) -> int:
     """
@@ -972,21 +1155,8 @@ def cleanup_empty_labels(service, plan: list, logger: logging.Logger,
     print(f"\n{C.BG_RED}{C.WHITE}{C.BOLD} CLEANUP: EMPTY OLD LABELS {C.RESET}")
     print(f"{C.CYAN}{'─' * 60}{C.RESET}")
 
-    empty_labels = []
-    for entry in plan:
-        try:
-            label_info = api_call_with_backoff(
-                service.users().labels().get(
-                    userId="me", id=entry["old_id"]
-                ).execute
-            )
-            msg_total = label_info.get("messagesTotal", 0)
-            if msg_total == 0:
-                empty_labels.append(entry)
-        except HttpError as e:
-            if e.resp.status == 404:
-                continue  # already deleted
-            logger.warning(f"Could not check label '{entry['old_name']}': {e}")
+    totals = get_label_totals(service, plan, logger)
+    empty_labels = [entry for entry in plan if totals.get(entry["old_id"]) == 0]
 
     if not empty_labels:
         print(f"  {C.GREEN}No empty old labels to clean up.{C.RESET}\n")
@@ -1009,28 +1179,24 @@ def cleanup_empty_labels(service, plan: list, logger: logging.Logger,
 
 def force_cleanup_empty_labels(service, plan: list, logger: logging.Logger) -> int:
     """Actually delete empty old labels. Called with --cleanup flag."""
+    totals = get_label_totals(service, plan, logger)
+    names = {entry["old_id"]: entry["old_name"] for entry in plan}
     removed = 0
-    for entry in plan:
-        try:
-            label_info = api_call_with_backoff(
-                service.users().labels().get(
-                    userId="me", id=entry["old_id"]
-                ).execute
-            )
-            msg_total = label_info.get("messagesTotal", 0)
-            if msg_total == 0:
-                api_call_with_backoff(
-                    service.users().labels().delete(
-                        userId="me", id=entry["old_id"]
-                    ).execute
-                )
-                logger.info(f"Deleted empty label: {entry['old_name']}")
-                print(f"  {C.RED}✗{C.RESET} Deleted: {C.YELLOW}{entry['old_name']}{C.RESET}")
-                removed += 1
-        except HttpError as e:
-            if e.resp.status == 404:
-                continue
-            logger.warning(f"Could not delete label '{entry['old_name']}': {e}")
+
+    def _on_delete(request_id, response, exception):
+        nonlocal removed
+        old_name = names[request_id]
+        if exception is None:
+            logger.info(f"Deleted empty label: {old_name}")
+            print(f"  {C.RED}✗{C.RESET} Deleted: {C.YELLOW}{old_name}{C.RESET}")
+            removed += 1
+        elif not (isinstance(exception, HttpError) and exception.resp.status == 404):
+            logger.warning(f"Could not delete label '{old_name}': {exception}")
+
+    _execute_batched(service, [
+        (old_id, service.users().labels().delete(userId="me", id=old_id))
+        for old_id, total in totals.items() if total == 0
+    ], _on_delete)
 
     print(f"\n  {C.GREEN}{C.BOLD}Removed {removed} empty labels.{C.RESET}\n")
     return removed
@@ -1051,8 +1217,16 @@ def process_all_emails(service, label_map: dict, logger: logging.Logger,
         "flagged_review": 0,
     }
 
+    rule_targets = resolve_rule_label_ids(label_map, logger)
+    flagged_id = label_map.get("FLAGGED-REVIEW")
+    if not flagged_id:
+        logger.warning("Label 'FLAGGED-REVIEW' not found in label_map")
+    flagged_targets = (("FLAGGED-REVIEW", flagged_id),) if flagged_id else ()
+    label_counts = stats["label_counts"]
+
     page_token = None
     page_num = 0
+    last_print = 0.0
 
     while True:
         page_num += 1
@@ -1080,11 +1254,11 @@ def process_all_emails(service, label_map: dict, logger: logging.Logger,
             stats["total_processed"] += 1
             count = stats["total_processed"]
 
-            if count % 50 == 0 or count == 1:
-                print(
-                    f"  {C.MAGENTA}▸{C.RESET} Processing message "
-                    f"{C.BOLD}{count}{C.RESET}..."
-                )
+            if count == 1 or count % PROGRESS_EVERY == 0:
+                now = time.monotonic()
+                if count == 1 or now - last_print > PROGRESS_INTERVAL:
+                    print(PROCESSING_FMT.format(count))
+                    last_print = now
 
             try:
                 msg = api_call_with_backoff(
@@ -1098,27 +1272,24 @@ def process_all_emails(service, label_map: dict, logger: logging.Logger,
                 stats["total_errors"] += 1
                 continue
 
-            headers = msg.get("payload", {}).get("headers", [])
-            matched_labels = categorize_message(headers)
+            values = header_values(msg.get("payload", {}).get("headers", []))
+            matched_rules = match_rules(values)
+            targets = merge_rule_labels(matched_rules, rule_targets, flagged_targets)
 
-            label_ids = []
-            for lbl_name in matched_labels:
-                lid = label_map.get(lbl_name)
-                if lid:
-                    label_ids.append(lid)
-                    stats["label_counts"][lbl_name] = stats["label_counts"].get(lbl_name, 0) + 1
-                else:
-                    logger.warning(f"Label '{lbl_name}' not found in label_map")
-
-            if "FLAGGED-REVIEW" in matched_labels:
+            if not matched_rules:
                 stats["flagged_review"] += 1
 
-            from_val = extract_header(headers, "From")[:50]
-            subj_val = extract_header(headers, "Subject")[:50]
-            logger.debug(
-                f"[{count}] From: {from_val} | Subject: {subj_val} "
-                f"→ {matched_labels}"
-            )
+            label_ids = []
+            for lbl_name, lid in targets:
+                label_ids.append(lid)
+                label_counts[lbl_name] = label_counts.get(lbl_name, 0) + 1
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"[{count}] From: {values.get('from', '')[:50]} | "
+                    f"Subject: {values.get('subject', '')[:50]} "
+                    f"→ {[lbl_name for lbl_name, _ in targets]}"
+                )
 
             if label_ids and not dry_run:
                 apply_labels(service, msg_id, label_ids, logger)
@@ -1148,8 +1319,7 @@ def print_summary(stats: dict):
         print(f"\n  {C.CYAN}{C.BOLD}Label Distribution:{C.RESET}")
         sorted_labels = sorted(stats["label_counts"].items(), key=lambda x: -x[1])
         for label, count in sorted_labels:
-            bar = "█" * min(count, 40)
-            print(f"    {C.BLUE}{label:<55}{C.RESET} {C.GREEN}{count:>5}{C.RESET} {C.MAGENTA}{bar}{C.RESET}")
+            print(SUMMARY_ROW.format(label, count, SUMMARY_BAR[:count]))
 
     print(f"\n{C.CYAN}{'─' * 60}{C.RESET}")
     print(f"  {C.GREEN}{C.BOLD}✓ Complete!{C.RESET} Log saved to {C.CYAN}{LOG_FILE}{C.RESET}\n")
@@ -1229,7 +1399,7 @@ def main():
     # Authenticate
     print(f"{C.CYAN}Authenticating with Gmail API...{C.RESET}")
     creds = authenticate(args.credentials, args.token)
-    service = build("gmail", "v1", credentials=creds)
+    service = build_service(creds)
     logger.info("Authentication successful")
     print(f"{C.GREEN}✓ Authenticated successfully{C.RESET}\n")
 
@@ -8,637 +8,634 @@ migration mapping, and utility functions.
 Run with: python -m pytest test_gmail_organizer.py -v
 """
 
-import os
+import re
 import sys
-import json
-import time
-import unittest
-from unittest.mock import MagicMock, patch, PropertyMock
-from io import StringIO
-
-# Import the module under test
-import gmail_organizer as go
-
-
-class TestLabelHierarchy(unittest.TestCase):
-    """Tests for the label hierarchy definition."""
-
-    def test_label_count_minimum(self):
-        """Verify at least 80 labels are defined."""
-        self.assertGreaterEqual(len(go.LABEL_HIERARCHY), 80)
-
-    def test_all_labels_are_strings(self):
-        for label in go.LABEL_HIERARCHY:
-            self.assertIsInstance(label, str)
-
-    def test_no_duplicate_labels(self):
-        seen = set()
-        for label in go.LABEL_HIERARCHY:
-            self.assertNotIn(label, seen, f"Duplicate label: {label}")
-            seen.add(label)
-
-    def test_parent_labels_exist(self):
-        label_set = set(go.LABEL_HIERARCHY)
-        for label in go.LABEL_HIERARCHY:
-            if "/" in label:
-                parent = label.rsplit("/", 1)[0]
-                self.assertIn(parent, label_set,
-                              f"Parent '{parent}' missing for '{label}'")
-
-    def test_top_level_categories(self):
-        expected_top = [
-            "TIMELINE-EVIDENCE", "MUSIC", "PROJECTS", "JOB-SEARCH",
-            "API-KEYS-CREDENTIALS", "CONTACTS", "ORDERS-RECEIPTS",
-            "NEWSLETTERS", "SOFTWARE-TRACKING", "SOCIAL-MEDIA",
-            "FLAGGED-REVIEW",
-        ]
-        for cat in expected_top:
-            self.assertIn(cat, go.LABEL_HIERARCHY)
-
-    def test_specific_deep_labels(self):
-        deep_labels = [
-            "TIMELINE-EVIDENCE/Location-Activity/Google-Maps",
-            "TIMELINE-EVIDENCE/Financial-Transactions/Robinhood-Investments",
-            "MUSIC/Collaborations/Caresse-Rae-Edna",
-            "PROJECTS/SSRN-Academic/eJournals",
-            "JOB-SEARCH/Alerts/Indeed",
-        ]
-        for label in deep_labels:
-            self.assertIn(label, go.LABEL_HIERARCHY)
-
-    def test_labels_ordered_parent_before_child(self):
-        seen = set()
-        for label in go.LABEL_HIERARCHY:
-            if "/" in label:
-                parent = label.rsplit("/", 1)[0]
-                self.assertIn(parent, seen,
-                              f"Parent '{parent}' not listed before child '{label}'")
-            seen.add(label)
-
-
-class TestExtractHeader(unittest.TestCase):
-    """Tests for the extract_header utility."""
-
-    def test_extract_existing_header(self):
-        headers = [
-            {"name": "From", "value": "test@example.com"},
-            {"name": "Subject", "value": "Hello World"},
-        ]
-        self.assertEqual(go.extract_header(headers, "From"), "test@example.com")
-
-    def test_extract_case_insensitive(self):
-        headers = [{"name": "FROM", "value": "test@example.com"}]
-        self.assertEqual(go.extract_header(headers, "from"), "test@example.com")
-
-    def test_extract_missing_header(self):
-        headers = [{"name": "From", "value": "test@example.com"}]
-        self.assertEqual(go.extract_header(headers, "Subject"), "")
-
-    def test_extract_empty_headers(self):
-        self.assertEqual(go.extract_header([], "From"), "")
-
-
-class TestCategorizationRules(unittest.TestCase):
-    """Tests for email categorization logic."""
-
-    def _make_headers(self, from_addr="", to_addr="", subject="",
-                      list_unsub=""):
-        headers = []
-        if from_addr:
-            headers.append({"name": "From", "value": from_addr})
-        if to_addr:
-            headers.append({"name": "To", "value": to_addr})
-        if subject:
-            headers.append({"name": "Subject", "value": subject})
-        if list_unsub:
-            headers.append({"name": "List-Unsubscribe", "value": list_unsub})
-        return headers
-
-    def test_self_email(self):
-        headers = self._make_headers(
-            from_addr="angelreporters@gmail.com",
-            to_addr="angelreporters@gmail.com",
-            subject="Note to self"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Communications-Sent/Self-Emails", labels)
-
-    def test_sent_to_contacts(self):
-        headers = self._make_headers(
-            from_addr="angelreporters@gmail.com",
-            to_addr="someone@example.com",
-            subject="Hello"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Communications-Sent/To-Contacts", labels)
-
-    def test_caresse_lopez_from(self):
-        headers = self._make_headers(from_addr="lopez.caresse@gmail.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("CONTACTS/Caresse-Lopez", labels)
-        self.assertIn("MUSIC/Collaborations/Caresse-Rae-Edna", labels)
-
-    def test_caresse_lopez_to(self):
-        headers = self._make_headers(
-            from_addr="angelreporters@gmail.com",
-            to_addr="lopez.caresse@gmail.com"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("CONTACTS/Caresse-Lopez", labels)
-
-    def test_github(self):
-        headers = self._make_headers(from_addr="notifications@github.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("PROJECTS/GitHub-Dev", labels)
-
-    def test_ssrn_from(self):
-        headers = self._make_headers(from_addr="noreply@ssrn.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("PROJECTS/SSRN-Academic", labels)
-
-    def test_ssrn_subject(self):
-        headers = self._make_headers(
-            from_addr="someone@example.com",
-            subject="Your SSRN paper was downloaded"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("PROJECTS/SSRN-Academic", labels)
-
-    def test_indeed_jobs(self):
-        headers = self._make_headers(
-            from_addr="alert@indeed.com",
-            subject="New job matches for you"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("JOB-SEARCH/Alerts/Indeed", labels)
-
-    def test_linkedin_jobs(self):
-        headers = self._make_headers(
-            from_addr="jobs-noreply@linkedin.com",
-            subject="Job recommendation"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("JOB-SEARCH/Alerts/LinkedIn", labels)
-
-    def test_amazon_orders(self):
-        headers = self._make_headers(
-            from_addr="ship-confirm@amazon.com",
-            subject="Your Amazon.com order has shipped"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("ORDERS-RECEIPTS/Amazon", labels)
-
-    def test_chase_banking(self):
-        headers = self._make_headers(from_addr="no-reply@alertsp.chase.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Financial-Transactions/Banking-Chase", labels)
-
-    def test_robinhood(self):
-        headers = self._make_headers(from_addr="noreply@robinhood.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Financial-Transactions/Robinhood-Investments", labels)
-
-    def test_uchealth(self):
-        headers = self._make_headers(from_addr="noreply@uchealth.org")
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Medical/UC-Health", labels)
-
-    def test_irs_subject(self):
-        headers = self._make_headers(
-            from_addr="someone@irs.gov", subject="IRS Notice"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Government/IRS", labels)
-
-    def test_ssa_subject(self):
-        headers = self._make_headers(subject="Your Social Security Statement")
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Government/SSA", labels)
-
-    def test_medicaid_subject(self):
-        headers = self._make_headers(subject="Medicaid renewal notice")
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Government/Medicaid-Medicare", labels)
-
-    def test_redfin(self):
-        headers = self._make_headers(from_addr="listings@redfin.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Location-Activity/Redfin-Property", labels)
-
-    def test_hqs_inspection(self):
-        headers = self._make_headers(subject="HQS Inspection Scheduled")
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Housing/HQS-Inspections", labels)
-
-    def test_soundcloud(self):
-        headers = self._make_headers(from_addr="noreply@soundcloud.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("MUSIC/Platforms/SoundCloud", labels)
-
-    def test_spotify(self):
-        headers = self._make_headers(from_addr="no-reply@spotify.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("MUSIC/Platforms/Spotify", labels)
-
-    def test_tiktok(self):
-        headers = self._make_headers(from_addr="noreply@tiktok.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("SOCIAL-MEDIA/TikTok", labels)
-
-    def test_reddit(self):
-        headers = self._make_headers(from_addr="noreply@reddit.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("SOCIAL-MEDIA/Reddit", labels)
-
-    def test_nextdoor(self):
-        headers = self._make_headers(from_addr="reply@nextdoor.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("SOCIAL-MEDIA/Nextdoor", labels)
-
-    def test_ebay(self):
-        headers = self._make_headers(from_addr="ebay@ebay.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("ORDERS-RECEIPTS/eBay", labels)
-
-    def test_etsy(self):
-        headers = self._make_headers(from_addr="transaction@etsy.com")
-        labels = go.categorize_message(headers)
-        self.assertIn("ORDERS-RECEIPTS/Etsy", labels)
-
-    def test_legal_court(self):
-        headers = self._make_headers(subject="Court hearing scheduled")
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Legal-Court", labels)
-
-    def test_api_keys_credentials(self):
-        headers = self._make_headers(
-            from_addr="angelreporters@gmail.com",
-            to_addr="angelreporters@gmail.com",
-            subject="API key for project"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("API-KEYS-CREDENTIALS/API-Keys", labels)
-
-    def test_newsletter_unsubscribe(self):
-        headers = self._make_headers(
-            from_addr="unknown@newsletter.example.com",
-            subject="Weekly digest",
-            list_unsub="<https://example.com/unsub>"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("NEWSLETTERS", labels)
-
-    def test_flagged_review_fallback(self):
-        headers = self._make_headers(
-            from_addr="random@unknown-domain.xyz",
-            subject="Random subject with no keywords"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("FLAGGED-REVIEW", labels)
-
-    def test_multiple_labels_applied(self):
-        headers = self._make_headers(
-            from_addr="angelreporters@gmail.com",
-            to_addr="angelreporters@gmail.com",
-            subject="API token backup"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("TIMELINE-EVIDENCE/Communications-Sent/Self-Emails", labels)
-        self.assertIn("API-KEYS-CREDENTIALS/API-Keys", labels)
-
-    def test_church_one20(self):
-        headers = self._make_headers(from_addr="pastor@one20church.org")
-        labels = go.categorize_message(headers)
-        self.assertIn("CONTACTS/Church-One20", labels)
-
-    def test_google_play_receipt(self):
-        headers = self._make_headers(
-            from_addr="googleplay-noreply@google.com",
-            subject="Your Google Play receipt"
-        )
-        labels = go.categorize_message(headers)
-        self.assertIn("ORDERS-RECEIPTS/Google-Play", labels)
-
-
-class TestRateLimitBackoff(unittest.TestCase):
-    """Tests for exponential backoff logic."""
-
-    @patch("gmail_organizer.time.sleep")
-    def test_backoff_retries_on_429(self, mock_sleep):
-        mock_resp = MagicMock()
-        mock_resp.status = 429
-        error = go.HttpError(mock_resp, b"Rate limit exceeded")
-
-        call_count = 0
-        def flaky_func():
-            nonlocal call_count
-            call_count += 1
-            if call_count < 3:
-                raise error
-            return "success"
-
-        result = go.api_call_with_backoff(flaky_func, max_retries=5)
-        self.assertEqual(result, "success")
-        self.assertEqual(call_count, 3)
-        self.assertEqual(mock_sleep.call_count, 2)
+import inspect
+import logging
+import importlib.util
+from types import SimpleNamespace
 
-    @patch("gmail_organizer.time.sleep")
-    def test_backoff_raises_after_max_retries(self, mock_sleep):
-        mock_resp = MagicMock()
-        mock_resp.status = 429
-        error = go.HttpError(mock_resp, b"Rate limit exceeded")
+import pytest
 
-        def always_fail():
+# Import the module under test (the full organizer with migration support)
+import gmail_organizer_original as go
+
+# Compiling here also validates every MIGRATION_MAP pattern at import time
+COMPILED_MIGRATION = [(re.compile(p, re.IGNORECASE), t) for p, t in go.MIGRATION_MAP]
+APPLY_LABELS_SIG = inspect.signature(go.apply_labels)
+# Projections of CATEGORIZATION_RULES shared by the rule structure tests
+RULE_NAMES = [rule.get("name") for rule in go.CATEGORIZATION_RULES]
+RULE_LABELS = [rule.get("labels") for rule in go.CATEGORIZATION_RULES]
+RULE_LABELS_FLAT = {label for labels in RULE_LABELS if labels for label in labels}
+# (label, parent) pairs in hierarchy order; parent is None for top-level labels
+LABEL_PARENTS = [
+    (label, label.rsplit("/", 1)[0] if "/" in label else None)
+    for label in go.LABEL_HIERARCHY
+]
+
+
+# ── Label hierarchy ──────────────────────────────────────────────────────────
+
+def test_label_count_minimum():
+    """Verify at least 80 labels are defined."""
+    assert len(go.LABEL_HIERARCHY) >= 80
+
+
+def test_all_labels_are_strings():
+    assert all(isinstance(label, str) for label in go.LABEL_HIERARCHY)
+
+
+def test_no_duplicate_labels():
+    seen = set()
+    for label in go.LABEL_HIERARCHY:
+        assert label not in seen, f"Duplicate label: {label}"
+        seen.add(label)
+
+
+def test_parent_labels_exist():
+    for label, parent in LABEL_PARENTS:
+        if parent is not None:
+            assert parent in go.LABEL_HIERARCHY_SET, (
+                f"Parent '{parent}' missing for '{label}'")
+
+
+def test_expected_labels_present():
+    expected_top = {
+        "TIMELINE-EVIDENCE", "MUSIC", "PROJECTS", "JOB-SEARCH",
+        "API-KEYS-CREDENTIALS", "CONTACTS", "ORDERS-RECEIPTS",
+        "NEWSLETTERS", "SOFTWARE-TRACKING", "SOCIAL-MEDIA",
+        "FLAGGED-REVIEW",
+    }
+    deep_labels = {
+        "TIMELINE-EVIDENCE/Location-Activity/Google-Maps",
+        "TIMELINE-EVIDENCE/Financial-Transactions/Robinhood-Investments",
+        "MUSIC/Collaborations/Caresse-Rae-Edna",
+        "PROJECTS/SSRN-Academic/eJournals",
+        "JOB-SEARCH/Alerts/Indeed",
+    }
+    missing = (expected_top | deep_labels) - go.LABEL_HIERARCHY_SET
+    assert not missing, f"Missing labels: {sorted(missing)}"
+
+
+def test_labels_ordered_parent_before_child():
+    seen = set()
+    for label, parent in LABEL_PARENTS:
+        if parent is not None:
+            assert parent in seen, f"Parent '{parent}' not listed before child '{label}'"
+        seen.add(label)
+
+
+# ── extract_header ───────────────────────────────────────────────────────────
+
+# Header lists shared by the extract_header cases
+_H_FROM = [{"name": "From", "value": "test@example.com"}]
+_H_FROM_SUBJECT = _H_FROM + [{"name": "Subject", "value": "Hello World"}]
+_H_UPPER = [{"name": "FROM", "value": "test@example.com"}]
+_H_NO_VALUE = [{"name": "Subject"}]
+
+
+@pytest.mark.parametrize("headers,name,expected", [
+    (_H_FROM_SUBJECT, "From", "test@example.com"),
+    (_H_UPPER, "from", "test@example.com"),
+    (_H_FROM, "Subject", ""),
+    ([], "From", ""),
+    (_H_NO_VALUE, "Subject", ""),
+], ids=["existing", "case-insensitive", "missing", "empty-headers", "no-value"])
+def test_extract_header(headers, name, expected):
+    assert go.extract_header(headers, name) == expected
+
+
+def test_header_values_match_extract_header():
+    headers = _H_FROM_SUBJECT + _H_UPPER + _H_NO_VALUE
+    values = go.header_values(headers)
+    assert values == {"from": "test@example.com", "subject": "Hello World"}
+    for name in ("From", "Subject"):
+        assert values[name.lower()] == go.extract_header(headers, name)
+
+
+# ── Categorization rules ─────────────────────────────────────────────────────
+
+def _make_headers(from_addr="", to_addr="", subject="", list_unsub=""):
+    headers = []
+    if from_addr:
+        headers.append({"name": "From", "value": from_addr})
+    if to_addr:
+        headers.append({"name": "To", "value": to_addr})
+    if subject:
+        headers.append({"name": "Subject", "value": subject})
+    if list_unsub:
+        headers.append({"name": "List-Unsubscribe", "value": list_unsub})
+    return headers
+
+
+# (from, to, subject, list_unsubscribe, expected_label, case_id)
+CATEGORIZATION_CASES = [
+    ("angelreporters@gmail.com", "angelreporters@gmail.com", "Note to self", "",
+     "TIMELINE-EVIDENCE/Communications-Sent/Self-Emails", "self-email"),
+    ("angelreporters@gmail.com", "someone@example.com", "Hello", "",
+     "TIMELINE-EVIDENCE/Communications-Sent/To-Contacts", "sent-to-contact"),
+    ("lopez.caresse@gmail.com", "", "", "",
+     "CONTACTS/Caresse-Lopez", "caresse-from-contact"),
+    ("lopez.caresse@gmail.com", "", "", "",
+     "MUSIC/Collaborations/Caresse-Rae-Edna", "caresse-from-music"),
+    ("angelreporters@gmail.com", "lopez.caresse@gmail.com", "", "",
+     "CONTACTS/Caresse-Lopez", "caresse-to"),
+    ("notifications@github.com", "", "", "", "PROJECTS/GitHub-Dev", "github"),
+    ("noreply@ssrn.com", "", "", "", "PROJECTS/SSRN-Academic", "ssrn-from"),
+    ("someone@example.com", "", "Your SSRN paper was downloaded", "",
+     "PROJECTS/SSRN-Academic", "ssrn-subject"),
+    ("alert@indeed.com", "", "New job matches for you", "",
+     "JOB-SEARCH/Alerts/Indeed", "indeed"),
+    ("jobs-noreply@linkedin.com", "", "Job recommendation", "",
+     "JOB-SEARCH/Alerts/LinkedIn", "linkedin"),
+    ("ship-confirm@amazon.com", "", "Your Amazon.com order has shipped", "",
+     "ORDERS-RECEIPTS/Amazon", "amazon"),
+    ("no-reply@alertsp.chase.com", "", "", "",
+     "TIMELINE-EVIDENCE/Financial-Transactions/Banking-Chase", "chase"),
+    ("noreply@robinhood.com", "", "", "",
+     "TIMELINE-EVIDENCE/Financial-Transactions/Robinhood-Investments", "robinhood"),
+    ("noreply@uchealth.org", "", "", "",
+     "TIMELINE-EVIDENCE/Medical/UC-Health", "uchealth"),
+    ("someone@irs.gov", "", "IRS Notice", "",
+     "TIMELINE-EVIDENCE/Government/IRS", "irs"),
+    ("", "", "Your Social Security Statement", "",
+     "TIMELINE-EVIDENCE/Government/SSA", "ssa"),
+    ("", "", "Medicaid renewal notice", "",
+     "TIMELINE-EVIDENCE/Government/Medicaid-Medicare", "medicaid"),
+    ("listings@redfin.com", "", "", "",
+     "TIMELINE-EVIDENCE/Location-Activity/Redfin-Property", "redfin"),
+    ("", "", "HQS Inspection Scheduled", "",
+     "TIMELINE-EVIDENCE/Housing/HQS-Inspections", "hqs-inspection"),
+    ("noreply@soundcloud.com", "", "", "", "MUSIC/Platforms/SoundCloud", "soundcloud"),
+    ("no-reply@spotify.com", "", "", "", "MUSIC/Platforms/Spotify", "spotify"),
+    ("noreply@tiktok.com", "", "", "", "SOCIAL-MEDIA/TikTok", "tiktok"),
+    ("noreply@reddit.com", "", "", "", "SOCIAL-MEDIA/Reddit", "reddit"),
+    ("reply@nextdoor.com", "", "", "", "SOCIAL-MEDIA/Nextdoor", "nextdoor"),
+    ("ebay@ebay.com", "", "", "", "ORDERS-RECEIPTS/eBay", "ebay"),
+    ("transaction@etsy.com", "", "", "", "ORDERS-RECEIPTS/Etsy", "etsy"),
+    ("", "", "Court hearing scheduled", "", "TIMELINE-EVIDENCE/Legal-Court", "court"),
+    ("angelreporters@gmail.com", "angelreporters@gmail.com", "API key for project", "",
+     "API-KEYS-CREDENTIALS/API-Keys", "api-key"),
+    ("unknown@newsletter.example.com", "", "Weekly digest", "<https://example.com/unsub>",
+     "NEWSLETTERS", "newsletter"),
+    ("random@unknown-domain.xyz", "", "Random subject with no keywords", "",
+     "FLAGGED-REVIEW", "flagged-review"),
+    # Multiple labels applied to one message
+    ("angelreporters@gmail.com", "angelreporters@gmail.com", "API token backup", "",
+     "TIMELINE-EVIDENCE/Communications-Sent/Self-Emails", "multi-label-self"),
+    ("angelreporters@gmail.com", "angelreporters@gmail.com", "API token backup", "",
+     "API-KEYS-CREDENTIALS/API-Keys", "multi-label-api-key"),
+    ("pastor@one20church.org", "", "", "", "CONTACTS/Church-One20", "church"),
+    ("googleplay-noreply@google.com", "", "Your Google Play receipt", "",
+     "ORDERS-RECEIPTS/Google-Play", "google-play"),
+]
+
+
+# Header lists are built once at collection time and shared by every run
+CATEGORIZATION_HEADERS = [(_make_headers(*case[:4]), case[4])
+                          for case in CATEGORIZATION_CASES]
+
+
+@pytest.mark.parametrize("headers,expected", CATEGORIZATION_HEADERS,
+                         ids=[case[5] for case in CATEGORIZATION_CASES])
+def test_categorize(headers, expected):
+    """Email categorization logic."""
+    assert expected in go.categorize_message(headers)
+
+
+# ── Rate-limit backoff ───────────────────────────────────────────────────────
+
+# Prebuilt API errors shared by the backoff tests
+_ERR_429 = go.HttpError(SimpleNamespace(status=429, reason="Too Many Requests"),
+                        b"Rate limit exceeded")
+_ERR_404 = go.HttpError(SimpleNamespace(status=404, reason="Not Found"), b"Not found")
+_ERR_500 = go.HttpError(SimpleNamespace(status=500, reason="Internal Server Error"),
+                        b"Server error")
+_ERR_503 = go.HttpError(SimpleNamespace(status=503, reason="Service Unavailable"),
+                        b"Service unavailable")
+_ERR_400 = go.HttpError(SimpleNamespace(status=400, reason="Bad Request"), b"Bad request")
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Replace time.sleep with a recorder so retries run instantly."""
+    calls = []
+    monkeypatch.setattr(go.time, "sleep", calls.append)
+    return calls
+
+
+def _fail_times(error, failures, result):
+    """Return a callable that raises `error` `failures` times, then returns `result`."""
+    attempts = []
+    def flaky_func():
+        attempts.append(1)
+        if len(attempts) <= failures:
             raise error
+        return result
+    flaky_func.attempts = attempts
+    return flaky_func
 
-        with self.assertRaises(RuntimeError):
-            go.api_call_with_backoff(always_fail, max_retries=3)
 
-    def test_non_retryable_error_raises_immediately(self):
-        mock_resp = MagicMock()
-        mock_resp.status = 404
-        error = go.HttpError(mock_resp, b"Not found")
+@pytest.mark.parametrize("error,failures", [
+    (_ERR_429, 2),
+    (_ERR_500, 1),
+    (_ERR_503, 1),
+], ids=["429", "500", "503"])
+def test_backoff_retries_transient_errors(sleeps, error, failures):
+    flaky_func = _fail_times(error, failures, "success")
+    assert go.api_call_with_backoff(flaky_func, max_retries=5) == "success"
+    assert len(flaky_func.attempts) == failures + 1
+    assert len(sleeps) == failures
 
-        def fail_404():
-            raise error
 
-        with self.assertRaises(go.HttpError):
-            go.api_call_with_backoff(fail_404, max_retries=5)
+def test_backoff_raises_after_max_retries(sleeps):
+    def always_fail():
+        raise _ERR_429
 
-    @patch("gmail_organizer.time.sleep")
-    def test_backoff_retries_on_500(self, mock_sleep):
-        mock_resp = MagicMock()
-        mock_resp.status = 500
-        error = go.HttpError(mock_resp, b"Server error")
+    with pytest.raises(RuntimeError):
+        go.api_call_with_backoff(always_fail, max_retries=3)
 
-        call_count = 0
-        def flaky_func():
-            nonlocal call_count
-            call_count += 1
-            if call_count < 2:
-                raise error
-            return "ok"
-
-        result = go.api_call_with_backoff(flaky_func, max_retries=5)
-        self.assertEqual(result, "ok")
-
-    @patch("gmail_organizer.time.sleep")
-    def test_backoff_retries_on_503(self, mock_sleep):
-        mock_resp = MagicMock()
-        mock_resp.status = 503
-        error = go.HttpError(mock_resp, b"Service unavailable")
-
-        call_count = 0
-        def flaky_func():
-            nonlocal call_count
-            call_count += 1
-            if call_count < 2:
+
+def test_non_retryable_error_raises_immediately():
+    def fail_404():
+        raise _ERR_404
+
+    with pytest.raises(go.HttpError):
+        go.api_call_with_backoff(fail_404, max_retries=5)
+
+
+# ── Empty-label cleanup ──────────────────────────────────────────────────────
+
+class _FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.calls = []
+
+    def add(self, request, request_id):
+        self.calls.append((request_id, request))
+
+    def execute(self):
+        self.service.batch_sizes.append(len(self.calls))
+        if self.service.batch_errors:
+            error = self.service.batch_errors.pop(0)
+            if error is not None:
                 raise error
-            return "ok"
+        for request_id, (method, label_id) in self.calls:
+            self.callback(request_id, *self.service.respond(method, label_id))
+
+
+class _FakeGmail:
+    """Stand-in for the labels.get/delete and batch parts of the Gmail service."""
+
+    def __init__(self, totals, failures=None):
+        self.totals = dict(totals)          # label id → messagesTotal
+        self.failures = failures or {}      # (method, label id) → error, raised once
+        self.batch_errors = []              # per-execute batch-level errors (or None)
+        self.batch_sizes = []
+
+    def users(self):
+        return self
+
+    def labels(self):
+        return self
+
+    def get(self, userId, id):
+        return ("get", id)
+
+    def delete(self, userId, id):
+        return ("delete", id)
+
+    def new_batch_http_request(self, callback):
+        return _FakeBatch(self, callback)
+
+    def respond(self, method, label_id):
+        error = self.failures.pop((method, label_id), None)
+        if error is not None:
+            return None, error
+        if label_id not in self.totals:
+            return None, _ERR_404
+        if method == "get":
+            return {"messagesTotal": self.totals[label_id]}, None
+        del self.totals[label_id]
+        return "", None
+
+
+def _plan(*label_ids):
+    return [{"old_id": label_id, "old_name": f"Old/{label_id}"} for label_id in label_ids]
+
+
+_CLEANUP_LOGGER = logging.getLogger("test_cleanup")
+
+
+def test_label_totals_split_at_batch_limit():
+    label_ids = [f"L{i}" for i in range(2 * go.BATCH_REQUEST_LIMIT + 20)]
+    service = _FakeGmail(dict.fromkeys(label_ids, 1))
+    totals = go.get_label_totals(service, _plan(*label_ids), _CLEANUP_LOGGER)
+    assert service.batch_sizes == [go.BATCH_REQUEST_LIMIT, go.BATCH_REQUEST_LIMIT, 20]
+    assert totals == dict.fromkeys(label_ids, 1)
+
+
+def test_label_totals_skip_deleted_labels(caplog):
+    service = _FakeGmail({"a": 0})
+    assert go.get_label_totals(service, _plan("a", "gone"), _CLEANUP_LOGGER) == {"a": 0}
+    assert not caplog.records
+
+
+def test_force_cleanup_deletes_only_empty_labels():
+    service = _FakeGmail({"a": 0, "b": 3, "c": 0})
+    assert go.force_cleanup_empty_labels(service, _plan("a", "b", "c"), _CLEANUP_LOGGER) == 2
+    assert service.totals == {"b": 3}
+
+
+def test_force_cleanup_retries_transient_errors(sleeps):
+    service = _FakeGmail({"a": 0, "b": 0, "c": 0},
+                         failures={("get", "a"): _ERR_429, ("delete", "b"): _ERR_503})
+    assert go.force_cleanup_empty_labels(service, _plan("a", "b", "c"), _CLEANUP_LOGGER) == 3
+    assert service.totals == {}
+    assert len(sleeps) == 2
+
+
+def test_cleanup_logs_batch_level_error(caplog):
+    service = _FakeGmail({"a": 0})
+    service.batch_errors = [_ERR_400]
+    assert go.cleanup_empty_labels(service, _plan("a"), _CLEANUP_LOGGER) == 0
+    assert "Could not check label 'Old/a'" in caplog.text
+
+
+def test_force_cleanup_logs_batch_level_error(caplog):
+    service = _FakeGmail({"a": 0})
+    service.batch_errors = [None, _ERR_400]
+    assert go.force_cleanup_empty_labels(service, _plan("a"), _CLEANUP_LOGGER) == 0
+    assert service.totals == {"a": 0}
+    assert "Could not delete label 'Old/a'" in caplog.text
+
+
+# ── process_all_emails ───────────────────────────────────────────────────────
+
+class _FakeMailbox:
+    """Stand-in for the messages.list/get/modify parts of the Gmail service."""
+
+    def __init__(self, headers_by_id):
+        self.headers_by_id = headers_by_id
+        self.applied = {}                   # message id → addLabelIds
+
+    def users(self):
+        return self
 
-        result = go.api_call_with_backoff(flaky_func, max_retries=5)
-        self.assertEqual(result, "ok")
+    def messages(self):
+        return self
 
+    def list(self, **kwargs):
+        stubs = [{"id": msg_id} for msg_id in self.headers_by_id]
+        return SimpleNamespace(execute=lambda: {"messages": stubs})
 
-class TestColorFormatter(unittest.TestCase):
-    """Tests for the colored log formatter."""
+    def get(self, userId, id, **kwargs):
+        return SimpleNamespace(execute=lambda: {"payload": {"headers": self.headers_by_id[id]}})
 
-    def test_formatter_produces_output(self):
-        import logging
-        formatter = go.ColorFormatter()
-        record = logging.LogRecord(
-            name="test", level=logging.INFO, pathname="", lineno=0,
-            msg="Test message", args=(), exc_info=None
-        )
-        output = formatter.format(record)
-        self.assertIn("Test message", output)
-        self.assertIn("INFO", output)
+    def modify(self, userId, id, body):
+        return SimpleNamespace(
+            execute=lambda: self.applied.__setitem__(id, body["addLabelIds"]))
 
 
-class TestCategorizationRulesStructure(unittest.TestCase):
-    """Tests for the structure of categorization rules."""
+_CARESSE = ["CONTACTS/Caresse-Lopez", "MUSIC/Collaborations/Caresse-Rae-Edna"]
+_MAILBOX = {
+    "m1": _make_headers("lopez.caresse@gmail.com"),
+    "m2": _make_headers("notifications@github.com"),
+    "m3": _make_headers("random@unknown-domain.xyz"),
+    "m4": _make_headers("lopez.caresse@gmail.com"),
+}
+_PROCESSING_LOGGER = logging.getLogger("test_processing")
 
-    def test_all_rules_have_names(self):
-        for rule in go.CATEGORIZATION_RULES:
-            self.assertIn("name", rule)
 
-    def test_all_rules_have_labels(self):
-        for rule in go.CATEGORIZATION_RULES:
-            self.assertIn("labels", rule)
-            self.assertIsInstance(rule["labels"], list)
-            self.assertGreater(len(rule["labels"]), 0)
+def _label_map(*missing):
+    return {lbl: f"id:{lbl}" for lbl in go.LABEL_HIERARCHY if lbl not in missing}
 
-    def test_all_rule_labels_in_hierarchy(self):
-        hierarchy_set = set(go.LABEL_HIERARCHY)
-        for rule in go.CATEGORIZATION_RULES:
-            for label in rule["labels"]:
-                self.assertIn(label, hierarchy_set,
-                              f"Rule '{rule['name']}' references unknown label: {label}")
 
-    def test_rule_count(self):
-        self.assertGreaterEqual(len(go.CATEGORIZATION_RULES), 20)
+def test_process_all_emails_applies_resolved_labels():
+    service = _FakeMailbox(_MAILBOX)
+    stats = go.process_all_emails(service, _label_map("PROJECTS/GitHub-Dev"),
+                                  _PROCESSING_LOGGER)
+    caresse_ids = [f"id:{lbl}" for lbl in _CARESSE]
+    # m2's only label is missing from label_map, so nothing is applied to it
+    assert service.applied == {"m1": caresse_ids, "m3": ["id:FLAGGED-REVIEW"],
+                               "m4": caresse_ids}
+    assert stats["label_counts"] == {_CARESSE[0]: 2, _CARESSE[1]: 2, "FLAGGED-REVIEW": 1}
+    assert stats["flagged_review"] == 1
+    assert stats["total_processed"] == 4
+    assert stats["total_labeled"] == 3
 
 
-class TestConstants(unittest.TestCase):
-    """Tests for application constants."""
+def test_process_all_emails_stops_at_max_messages():
+    service = _FakeMailbox(_MAILBOX)
+    stats = go.process_all_emails(service, _label_map(), _PROCESSING_LOGGER, max_messages=2)
+    assert stats["total_processed"] == 2
+    assert list(service.applied) == ["m1", "m2"]
 
-    def test_scopes(self):
-        self.assertIn("https://mail.google.com/", go.SCOPES)
 
-    def test_version_format(self):
-        parts = go.VERSION.split(".")
-        self.assertEqual(len(parts), 3)
-        for p in parts:
-            self.assertTrue(p.isdigit())
+def test_process_all_emails_debug_log(caplog):
+    service = _FakeMailbox({"m1": _MAILBOX["m1"]})
+    with caplog.at_level(logging.DEBUG, logger=_PROCESSING_LOGGER.name):
+        go.process_all_emails(service, _label_map(), _PROCESSING_LOGGER, dry_run=True)
+    assert f"[1] From: lopez.caresse@gmail.com | Subject:  → {_CARESSE}" in caplog.text
 
-    def test_batch_size_reasonable(self):
-        self.assertGreater(go.BATCH_SIZE, 0)
-        self.assertLessEqual(go.BATCH_SIZE, 500)
+
+def test_process_all_emails_without_flagged_label():
+    service = _FakeMailbox({"m3": _MAILBOX["m3"]})
+    stats = go.process_all_emails(service, _label_map("FLAGGED-REVIEW"), _PROCESSING_LOGGER)
+    assert service.applied == {}
+    assert stats["label_counts"] == {}
+    assert stats["flagged_review"] == 1
+
+
+# ── setup_logging ────────────────────────────────────────────────────────────
+
+def test_setup_logging_idempotent(tmp_path):
+    logger = logging.getLogger("gmail_organizer")
+    saved = logger.handlers[:]
+    logger.handlers.clear()
+    try:
+        first = go.setup_logging(str(tmp_path / "first.log"))
+        second = go.setup_logging(str(tmp_path / "second.log"))
+        assert second is first
+        assert len(second.handlers) == 2
+        # The early return means the second call never opens its log file
+        assert not (tmp_path / "second.log").exists()
+    finally:
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers[:] = saved
+
+
+# ── Colored log formatter ────────────────────────────────────────────────────
+
+def test_formatter_produces_output():
+    formatter = go.ColorFormatter()
+    record = logging.LogRecord(
+        name="test", level=logging.INFO, pathname="", lineno=0,
+        msg="Test message", args=(), exc_info=None
+    )
+    output = formatter.format(record)
+    assert "Test message" in output
+    assert "INFO" in output
+
+
+# ── Categorization rule structure ────────────────────────────────────────────
+
+def test_all_rules_have_names():
+    assert all(RULE_NAMES)
+
+
+def test_all_rules_have_labels():
+    assert all(isinstance(labels, list) and labels for labels in RULE_LABELS)
+
+
+def test_all_rule_labels_in_hierarchy():
+    missing = RULE_LABELS_FLAT - go.LABEL_HIERARCHY_SET
+    assert not missing, f"Rules reference unknown labels: {sorted(missing)}"
+
+
+def test_rule_count():
+    assert len(go.CATEGORIZATION_RULES) >= 20
+
+
+@pytest.mark.parametrize("pattern,compiled", [
+    (r"github\.com", "github.com"),
+    ("Robinhood", "robinhood"),
+    ("(one20|dusty)", re.compile("(one20|dusty)", re.IGNORECASE)),
+], ids=["escaped-literal", "mixed-case-literal", "regex"])
+def test_compile_address_pattern(pattern, compiled):
+    assert go._compile_address_pattern(pattern) == compiled
+
+
+# ── Constants ────────────────────────────────────────────────────────────────
+
+def test_scopes():
+    assert "https://mail.google.com/" in go.SCOPES
+
+
+def test_version_format():
+    parts = go.VERSION.split(".")
+    assert len(parts) == 3
+    assert all(p.isdigit() for p in parts)
+
+
+def test_batch_size_reasonable():
+    assert 0 < go.BATCH_SIZE <= 500
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # MIGRATION TESTS
 # ══════════════════════════════════════════════════════════════════════════════
 
-class TestMigrationMapping(unittest.TestCase):
+# (old_label, expected_new_label)
+MIGRATION_CASES = [
+    ("Legal", "TIMELINE-EVIDENCE/Legal-Court"),
+    ("legal", "TIMELINE-EVIDENCE/Legal-Court"),
+    ("Music", "MUSIC"),
+    ("Work", "JOB-SEARCH"),
+    ("Jobs", "JOB-SEARCH"),
+    ("Career", "JOB-SEARCH"),
+    ("Banking", "TIMELINE-EVIDENCE/Financial-Transactions/Banking-Chase"),
+    ("Chase", "TIMELINE-EVIDENCE/Financial-Transactions/Banking-Chase"),
+    ("Robinhood", "TIMELINE-EVIDENCE/Financial-Transactions/Robinhood-Investments"),
+    ("GitHub", "PROJECTS/GitHub-Dev"),
+    ("SSRN", "PROJECTS/SSRN-Academic"),
+    ("Amazon", "ORDERS-RECEIPTS/Amazon"),
+    ("eBay", "ORDERS-RECEIPTS/eBay"),
+    ("TikTok", "SOCIAL-MEDIA/TikTok"),
+    ("Reddit", "SOCIAL-MEDIA/Reddit"),
+    ("Newsletters", "NEWSLETTERS"),
+    ("Medical", "TIMELINE-EVIDENCE/Medical"),
+    ("Tax", "TIMELINE-EVIDENCE/Government/IRS"),
+    ("Rent", "TIMELINE-EVIDENCE/Housing/Rent-Payments"),
+    ("Travel", "TIMELINE-EVIDENCE/Location-Activity/Travel-Transport"),
+    ("SoundCloud", "MUSIC/Platforms/SoundCloud"),
+    ("Spotify", "MUSIC/Platforms/Spotify"),
+    # Old nested labels map by their leaf segment
+    ("Old/Legal", "TIMELINE-EVIDENCE/Legal-Court"),
+    ("Interviews", "JOB-SEARCH/Interviews"),
+    ("Subscriptions", "ORDERS-RECEIPTS/Subscriptions"),
+    ("Passwords", "API-KEYS-CREDENTIALS/Passwords"),
+    ("Caresse", "CONTACTS/Caresse-Lopez"),
+    ("Church", "CONTACTS/Church-One20"),
+    # System labels are never mapped
+    ("INBOX", None),
+    ("SENT", None),
+    ("TRASH", None),
+    ("SPAM", None),
+    ("DRAFT", None),
+    ("STARRED", None),
+    ("UNREAD", None),
+    ("IMPORTANT", None),
+    ("CATEGORY_SOCIAL", None),
+    ("CATEGORY_PROMOTIONS", None),
+    # Labels already in our hierarchy are not re-mapped
+    ("TIMELINE-EVIDENCE", None),
+    ("MUSIC", None),
+    ("FLAGGED-REVIEW", None),
+    ("PROJECTS/GitHub-Dev", None),
+    # Labels with no matching pattern
+    ("RandomXYZ123", None),
+]
+
+
+@pytest.mark.parametrize("old,expected", MIGRATION_CASES,
+                         ids=[case[0] for case in MIGRATION_CASES])
+def test_map_old_label(old, expected):
     """Tests for the map_old_label_to_new function."""
+    assert go.map_old_label_to_new(old) == expected
+
+
+# ── MIGRATION_MAP structure ──────────────────────────────────────────────────
+
+def test_migration_map_not_empty():
+    assert len(go.MIGRATION_MAP) > 50
+
+
+def test_all_migration_targets_in_hierarchy():
+    """Every target label in MIGRATION_MAP must exist in LABEL_HIERARCHY."""
+    for pattern, target in go.MIGRATION_MAP:
+        assert target in go.LABEL_HIERARCHY_SET, (
+            f"Migration target '{target}' not in hierarchy (pattern: {pattern})")
+
+
+def test_migration_map_entries_are_tuples():
+    for entry in go.MIGRATION_MAP:
+        assert isinstance(entry, tuple)
+        assert len(entry) == 2
+
+
+def test_migration_patterns_are_valid_regex():
+    assert len(COMPILED_MIGRATION) == len(go.MIGRATION_MAP)
+    assert all(isinstance(compiled, re.Pattern) for compiled, _ in COMPILED_MIGRATION)
+
+
+def test_migration_patterns_are_anchored():
+    """MIGRATION_MATCHER relies on every pattern being anchored at the start."""
+    for pattern, target in go.MIGRATION_MAP:
+        assert pattern.startswith("^"), f"Unanchored pattern '{pattern}'"
+
+
+# ── apply_labels ─────────────────────────────────────────────────────────────
+
+def test_apply_labels_accepts_remove_param():
+    """apply_labels should accept remove_label_ids keyword."""
+    assert "remove_label_ids" in APPLY_LABELS_SIG.parameters
+
+
+# ── Dependency check ─────────────────────────────────────────────────────────
 
-    def test_legal_maps_to_legal_court(self):
-        result = go.map_old_label_to_new("Legal")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Legal-Court")
-
-    def test_legal_case_insensitive(self):
-        result = go.map_old_label_to_new("legal")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Legal-Court")
-
-    def test_music_maps_to_music(self):
-        result = go.map_old_label_to_new("Music")
-        self.assertEqual(result, "MUSIC")
-
-    def test_work_maps_to_job_search(self):
-        result = go.map_old_label_to_new("Work")
-        self.assertEqual(result, "JOB-SEARCH")
-
-    def test_jobs_maps_to_job_search(self):
-        result = go.map_old_label_to_new("Jobs")
-        self.assertEqual(result, "JOB-SEARCH")
-
-    def test_career_maps_to_job_search(self):
-        result = go.map_old_label_to_new("Career")
-        self.assertEqual(result, "JOB-SEARCH")
-
-    def test_bank_maps_to_banking(self):
-        result = go.map_old_label_to_new("Banking")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Financial-Transactions/Banking-Chase")
-
-    def test_chase_maps_to_banking_chase(self):
-        result = go.map_old_label_to_new("Chase")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Financial-Transactions/Banking-Chase")
-
-    def test_robinhood_maps_correctly(self):
-        result = go.map_old_label_to_new("Robinhood")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Financial-Transactions/Robinhood-Investments")
-
-    def test_github_maps_to_github_dev(self):
-        result = go.map_old_label_to_new("GitHub")
-        self.assertEqual(result, "PROJECTS/GitHub-Dev")
-
-    def test_ssrn_maps_to_ssrn_academic(self):
-        result = go.map_old_label_to_new("SSRN")
-        self.assertEqual(result, "PROJECTS/SSRN-Academic")
-
-    def test_amazon_maps_to_orders(self):
-        result = go.map_old_label_to_new("Amazon")
-        self.assertEqual(result, "ORDERS-RECEIPTS/Amazon")
-
-    def test_ebay_maps_to_orders(self):
-        result = go.map_old_label_to_new("eBay")
-        self.assertEqual(result, "ORDERS-RECEIPTS/eBay")
-
-    def test_tiktok_maps_to_social(self):
-        result = go.map_old_label_to_new("TikTok")
-        self.assertEqual(result, "SOCIAL-MEDIA/TikTok")
-
-    def test_reddit_maps_to_social(self):
-        result = go.map_old_label_to_new("Reddit")
-        self.assertEqual(result, "SOCIAL-MEDIA/Reddit")
-
-    def test_newsletter_maps(self):
-        result = go.map_old_label_to_new("Newsletters")
-        self.assertEqual(result, "NEWSLETTERS")
-
-    def test_medical_maps(self):
-        result = go.map_old_label_to_new("Medical")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Medical")
-
-    def test_tax_maps_to_irs(self):
-        result = go.map_old_label_to_new("Tax")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Government/IRS")
-
-    def test_rent_maps_to_housing(self):
-        result = go.map_old_label_to_new("Rent")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Housing/Rent-Payments")
-
-    def test_travel_maps_correctly(self):
-        result = go.map_old_label_to_new("Travel")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Location-Activity/Travel-Transport")
-
-    def test_soundcloud_maps(self):
-        result = go.map_old_label_to_new("SoundCloud")
-        self.assertEqual(result, "MUSIC/Platforms/SoundCloud")
-
-    def test_spotify_maps(self):
-        result = go.map_old_label_to_new("Spotify")
-        self.assertEqual(result, "MUSIC/Platforms/Spotify")
-
-    def test_system_labels_return_none(self):
-        """System labels should not be mapped."""
-        self.assertIsNone(go.map_old_label_to_new("INBOX"))
-        self.assertIsNone(go.map_old_label_to_new("SENT"))
-        self.assertIsNone(go.map_old_label_to_new("TRASH"))
-        self.assertIsNone(go.map_old_label_to_new("SPAM"))
-        self.assertIsNone(go.map_old_label_to_new("DRAFT"))
-        self.assertIsNone(go.map_old_label_to_new("STARRED"))
-        self.assertIsNone(go.map_old_label_to_new("UNREAD"))
-        self.assertIsNone(go.map_old_label_to_new("IMPORTANT"))
-        self.assertIsNone(go.map_old_label_to_new("CATEGORY_SOCIAL"))
-        self.assertIsNone(go.map_old_label_to_new("CATEGORY_PROMOTIONS"))
-
-    def test_existing_hierarchy_labels_return_none(self):
-        """Labels already in our hierarchy should not be re-mapped."""
-        self.assertIsNone(go.map_old_label_to_new("TIMELINE-EVIDENCE"))
-        self.assertIsNone(go.map_old_label_to_new("MUSIC"))
-        self.assertIsNone(go.map_old_label_to_new("FLAGGED-REVIEW"))
-        self.assertIsNone(go.map_old_label_to_new("PROJECTS/GitHub-Dev"))
-
-    def test_nested_old_label_maps_by_leaf(self):
-        """Old nested labels should map by their leaf segment."""
-        result = go.map_old_label_to_new("Old/Legal")
-        self.assertEqual(result, "TIMELINE-EVIDENCE/Legal-Court")
-
-    def test_interview_maps(self):
-        result = go.map_old_label_to_new("Interviews")
-        self.assertEqual(result, "JOB-SEARCH/Interviews")
-
-    def test_subscription_maps(self):
-        result = go.map_old_label_to_new("Subscriptions")
-        self.assertEqual(result, "ORDERS-RECEIPTS/Subscriptions")
-
-    def test_password_maps(self):
-        result = go.map_old_label_to_new("Passwords")
-        self.assertEqual(result, "API-KEYS-CREDENTIALS/Passwords")
-
-    def test_unknown_label_returns_none(self):
-        """Labels with no matching pattern should return None."""
-        result = go.map_old_label_to_new("RandomXYZ123")
-        self.assertIsNone(result)
-
-    def test_caresse_maps(self):
-        result = go.map_old_label_to_new("Caresse")
-        self.assertEqual(result, "CONTACTS/Caresse-Lopez")
-
-    def test_church_maps(self):
-        result = go.map_old_label_to_new("Church")
-        self.assertEqual(result, "CONTACTS/Church-One20")
-
-
-class TestMigrationMapStructure(unittest.TestCase):
-    """Tests for the MIGRATION_MAP structure."""
-
-    def test_migration_map_not_empty(self):
-        self.assertGreater(len(go.MIGRATION_MAP), 50)
-
-    def test_all_migration_targets_in_hierarchy(self):
-        """Every target label in MIGRATION_MAP must exist in LABEL_HIERARCHY."""
-        hierarchy_set = set(go.LABEL_HIERARCHY)
-        for pattern, target in go.MIGRATION_MAP:
-            self.assertIn(target, hierarchy_set,
-                          f"Migration target '{target}' not in hierarchy (pattern: {pattern})")
-
-    def test_migration_map_entries_are_tuples(self):
-        for entry in go.MIGRATION_MAP:
-            self.assertIsInstance(entry, tuple)
-            self.assertEqual(len(entry), 2)
-
-    def test_migration_patterns_are_valid_regex(self):
-        import re
-        for pattern, target in go.MIGRATION_MAP:
-            try:
-                re.compile(pattern)
-            except re.error as e:
-                self.fail(f"Invalid regex pattern '{pattern}': {e}")
-
-
-class TestApplyLabelsSignature(unittest.TestCase):
-    """Test that apply_labels supports remove_label_ids parameter."""
-
-    def test_apply_labels_accepts_remove_param(self):
-        """apply_labels should accept remove_label_ids keyword."""
-        import inspect
-        sig = inspect.signature(go.apply_labels)
-        params = list(sig.parameters.keys())
-        self.assertIn("remove_label_ids", params)
+def test_missing_deferred_dependency_exits_with_install_hint(monkeypatch, capsys):
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec",
+                        lambda name, *args: None if name == "httplib2"
+                        else real_find_spec(name, *args))
+    spec = importlib.util.spec_from_file_location("go_missing_dependency", go.__file__)
+    with pytest.raises(SystemExit):
+        spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    assert "pip install" in capsys.readouterr().out
 
 
 if __name__ == "__main__":
-    unittest.main()
+    sys.exit(pytest.main([__file__, "-v"]))